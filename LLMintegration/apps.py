@@ -1,6 +1,35 @@
+import os
+import sys
+import threading
+
 from django.apps import AppConfig
+from django.conf import settings
+from django.core.management import get_commands
+
+
+def _should_warm_up():
+    """
+    Warm up only in processes that serve requests: skip management commands like migrate
+    (however they are invoked: manage.py, django-admin, python -m django), and the runserver
+    autoreloader's parent process (only its child has RUN_MAIN set; with --noreload there is no child).
+    """
+    if not settings.VECTORSTORE_WARMUP:
+        return False
+    subcommand = sys.argv[1] if len(sys.argv) > 1 else None
+    if subcommand in get_commands():
+        if subcommand != "runserver":
+            return False
+        return "--noreload" in sys.argv or os.environ.get("RUN_MAIN") == "true"
+    return True
 
 
 class LlmintegrationConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "LLMintegration"
+
+    def ready(self):
+        if _should_warm_up():
+            from .vectorstore_utils import warm_up_vectorstore
+
+            # In the background so server startup isn't blocked by loading Chroma.
+            threading.Thread(target=warm_up_vectorstore, daemon=True).start()
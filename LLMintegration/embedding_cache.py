@@ -0,0 +1,185 @@
+"""
+Content-hash keyed cache for document embeddings.
+
+Re-ingesting a document (edited post with unchanged paragraphs, re-running a migration/backfill)
+produces the same chunk texts again. Instead of paying an embedding API call for each of them,
+CachedEmbeddings looks every text up by blake2b(model_name + "\\0" + text):
+1. An in-process LRU (OrderedDict) for hot chunks.
+2. A SQLite file on disk so the cache survives restarts and is shared between worker processes.
+Only the misses are sent to the wrapped embedding model, and the results are stitched back in input order.
+
+Vectors are kept as float32 (the precision Chroma stores them in): array("f") in memory, about 3 KB per
+768-dim vector instead of ~25 KB as a list of Python floats, and float32 blobs on disk. The SQLite file is
+capped at max_disk_entries rows; beyond that the least recently written entries are pruned.
+
+Queries (embed_query) are passed through untouched: they are short-lived user input and not worth persisting.
+"""
+
+import asyncio
+import hashlib
+import logging
+import sqlite3
+import threading
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MEMORY_CACHE_SIZE = (
+    4096  # number of vectors kept in the in-process LRU (~12 MB at 768 dims)
+)
+DEFAULT_DISK_CACHE_MAX_ENTRIES = (
+    100_000  # rows kept in the SQLite file (~300 MB at 768 dims)
+)
+
+
+class CachedEmbeddings(Embeddings):
+    """Wraps an Embeddings instance and caches embed_documents results by content hash."""
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        model_name: str,
+        cache_path: Path,
+        memory_cache_size: int = DEFAULT_MEMORY_CACHE_SIZE,
+        max_disk_entries: int = DEFAULT_DISK_CACHE_MAX_ENTRIES,
+    ):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.memory_cache_size = memory_cache_size
+        self.max_disk_entries = max_disk_entries
+        self._memory_cache = OrderedDict()
+        self._lock = threading.Lock()
+
+        cache_path = Path(cache_path)
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        # One connection shared by all threads, guarded by self._lock.
+        self._connection = sqlite3.connect(str(cache_path), check_same_thread=False)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+        )
+        self._connection.commit()
+
+    def _key(self, text: str) -> str:
+        return hashlib.blake2b(f"{self.model_name}\0{text}".encode("utf-8")).hexdigest()
+
+    def _lookup(self, keys: list[str]) -> dict:
+        """Returns {key: vector} for the keys found in memory or on disk."""
+        found = {}
+        with self._lock:
+            for key in keys:
+                vector = self._memory_cache.get(key)
+                if vector is not None:
+                    self._memory_cache.move_to_end(key)
+                    found[key] = vector.tolist()
+
+            disk_keys = [key for key in keys if key not in found]
+            # Stay well below SQLite's limit on bound parameters per statement.
+            for start in range(0, len(disk_keys), 500):
+                batch = disk_keys[start : start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._connection.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                    batch,
+                ).fetchall()
+                for key, blob in rows:
+                    vector = array("f", blob)
+                    found[key] = vector.tolist()
+                    self._remember(key, vector)
+        return found
+
+    def _store(self, items: dict):
+        """Persists {key: vector} to memory and disk."""
+        vectors = {key: array("f", vector) for key, vector in items.items()}
+        with self._lock:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                [(key, vector.tobytes()) for key, vector in vectors.items()],
+            )
+            self._prune()
+            self._connection.commit()
+            for key, vector in vectors.items():
+                self._remember(key, vector)
+
+    def _prune(self):
+        # Caller must hold self._lock. INSERT OR REPLACE gives a rewritten row a new rowid,
+        # so the lowest rowids are the least recently written entries (cache hits don't refresh them).
+        (count,) = self._connection.execute(
+            "SELECT COUNT(*) FROM embeddings"
+        ).fetchone()
+        if count > self.max_disk_entries:
+            self._connection.execute(
+                "DELETE FROM embeddings WHERE rowid IN "
+                "(SELECT rowid FROM embeddings ORDER BY rowid LIMIT ?)",
+                (count - self.max_disk_entries,),
+            )
+
+    def _remember(self, key: str, vector: array):
+        # Caller must hold self._lock.
+        self._memory_cache[key] = vector
+        self._memory_cache.move_to_end(key)
+        while len(self._memory_cache) > self.memory_cache_size:
+            self._memory_cache.popitem(last=False)
+
+    def _missing(self, keys: list[str], texts: list[str], cached: dict) -> dict:
+        """Texts to embed, deduplicated so repeated chunks in one call are embedded once."""
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+        return missing
+
+    def _safe_lookup(self, keys: list[str]) -> dict:
+        try:
+            return self._lookup(keys)
+        except sqlite3.Error as e:
+            logger.error(f"Embedding cache lookup failed: {e}", exc_info=True)
+            return {}
+
+    def _safe_store(self, items: dict):
+        try:
+            self._store(items)
+        except sqlite3.Error as e:
+            logger.error(f"Embedding cache write failed: {e}", exc_info=True)
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        keys = [self._key(text) for text in texts]
+        cached = self._safe_lookup(keys)
+        missing = self._missing(keys, texts, cached)
+
+        if missing:
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            computed = dict(zip(missing.keys(), vectors))
+            self._safe_store(computed)
+            cached.update(computed)
+
+        logger.info(
+            f"Embedding cache: {len(texts) - len(missing)} hits, {len(missing)} misses."
+        )
+        return [cached[key] for key in keys]
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        keys = [self._key(text) for text in texts]
+        # SQLite access is blocking, keep it off the event loop.
+        cached = await asyncio.to_thread(self._safe_lookup, keys)
+        missing = self._missing(keys, texts, cached)
+
+        if missing:
+            vectors = await self.embeddings.aembed_documents(list(missing.values()))
+            computed = dict(zip(missing.keys(), vectors))
+            await asyncio.to_thread(self._safe_store, computed)
+            cached.update(computed)
+
+        logger.info(
+            f"Embedding cache: {len(texts) - len(missing)} hits, {len(missing)} misses."
+        )
+        return [cached[key] for key in keys]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embeddings.embed_query(text)
+
+    async def aembed_query(self, text: str) -> list[float]:
+        return await self.embeddings.aembed_query(text)
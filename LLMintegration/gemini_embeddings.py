@@ -0,0 +1,181 @@
+"""
+Embeddings client that calls the Gemini REST API (batchEmbedContents) directly.
+
+All requests go through one module-level httpx.Client with HTTP/2 and keep-alive, so repeated
+embedding calls reuse the same connection instead of paying a TLS handshake each time.
+Async calls made inside an async_http_client_session() block likewise share one httpx.AsyncClient.
+Rate-limit (429) and server (5xx) errors are retried up to MAX_RETRIES times with exponential backoff,
+honoring the Retry-After header when the API sends one.
+Implements LangChain's Embeddings interface, so it can be used anywhere GoogleGenerativeAIEmbeddings was
+(Chroma, CachedEmbeddings, ...).
+"""
+
+import asyncio
+import contextlib
+import contextvars
+import logging
+import threading
+import time
+
+import httpx
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+GEMINI_API_BASE_URL = "https://generativelanguage.googleapis.com/v1beta"
+MAX_BATCH_SIZE = 100  # max requests per batchEmbedContents call
+REQUEST_TIMEOUT_SECONDS = 30.0
+MAX_RETRIES = 4
+RETRY_BACKOFF_SECONDS = 1.0  # doubled on every retry unless the API sends Retry-After
+MAX_RETRY_DELAY_SECONDS = 30.0
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+_http_client = None
+_http_client_lock = threading.Lock()
+# AsyncClient of the enclosing async_http_client_session(), if any
+_async_http_client = contextvars.ContextVar("gemini_async_http_client", default=None)
+
+
+def get_http_client():
+    """Initializes and returns the shared HTTP/2 client used for all embedding requests."""
+    global _http_client
+    if _http_client is None:
+        with _http_client_lock:
+            if _http_client is None:
+                _http_client = httpx.Client(
+                    http2=True,
+                    limits=httpx.Limits(max_keepalive_connections=16),
+                    timeout=REQUEST_TIMEOUT_SECONDS,
+                )
+    return _http_client
+
+
+def _retry_delay(response: httpx.Response, attempt: int):
+    """Seconds to wait before retrying a failed request (attempt counts from 0), or None to give up."""
+    if response.status_code not in RETRYABLE_STATUS_CODES or attempt >= MAX_RETRIES:
+        return None
+    try:
+        delay = float(response.headers["Retry-After"])
+    except (KeyError, ValueError):  # missing, or an HTTP date
+        delay = RETRY_BACKOFF_SECONDS * 2**attempt
+    return min(delay, MAX_RETRY_DELAY_SECONDS)
+
+
+@contextlib.asynccontextmanager
+async def async_http_client_session():
+    """
+    Opens one HTTP/2 httpx.AsyncClient for all aembed_* calls made inside the block, including tasks
+    started there with asyncio.gather (they inherit the context), so they multiplex over one connection.
+    httpx.AsyncClient is bound to the running event loop, so it can't be shared module-wide like the sync client.
+    """
+    async with httpx.AsyncClient(
+        http2=True,
+        limits=httpx.Limits(max_keepalive_connections=16),
+        timeout=REQUEST_TIMEOUT_SECONDS,
+    ) as client:
+        token = _async_http_client.set(client)
+        try:
+            yield client
+        finally:
+            _async_http_client.reset(token)
+
+
+class GeminiEmbeddings(Embeddings):
+    """
+    Gemini embedding model over the REST API.
+    Documents are embedded with task type RETRIEVAL_DOCUMENT and queries with RETRIEVAL_QUERY,
+    same as langchain_google_genai's GoogleGenerativeAIEmbeddings.
+    """
+
+    def __init__(self, model: str, google_api_key: str):
+        self.model = model  # e.g. "models/embedding-001"
+        self.google_api_key = google_api_key
+
+    def _batch_url(self) -> str:
+        return f"{GEMINI_API_BASE_URL}/{self.model}:batchEmbedContents"
+
+    def _batch_request(self, texts: list[str], task_type: str) -> dict:
+        return {
+            "headers": {"x-goog-api-key": self.google_api_key},
+            "json": {
+                "requests": [
+                    {
+                        "model": self.model,
+                        "content": {"parts": [{"text": text}]},
+                        "taskType": task_type,
+                    }
+                    for text in texts
+                ]
+            },
+        }
+
+    def _post(self, request: dict) -> httpx.Response:
+        attempt = 0
+        while True:
+            response = get_http_client().post(self._batch_url(), **request)
+            delay = _retry_delay(response, attempt)
+            if delay is None:
+                response.raise_for_status()
+                return response
+            logger.warning(
+                f"Embedding request failed with {response.status_code}, retrying in {delay:.1f}s."
+            )
+            time.sleep(delay)
+            attempt += 1
+
+    async def _apost(self, client: httpx.AsyncClient, request: dict) -> httpx.Response:
+        attempt = 0
+        while True:
+            response = await client.post(self._batch_url(), **request)
+            delay = _retry_delay(response, attempt)
+            if delay is None:
+                response.raise_for_status()
+                return response
+            logger.warning(
+                f"Embedding request failed with {response.status_code}, retrying in {delay:.1f}s."
+            )
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def _batch_embed(self, texts: list[str], task_type: str) -> list[list[float]]:
+        vectors = []
+        for start in range(0, len(texts), MAX_BATCH_SIZE):
+            response = self._post(
+                self._batch_request(texts[start : start + MAX_BATCH_SIZE], task_type)
+            )
+            vectors.extend(
+                embedding["values"] for embedding in response.json()["embeddings"]
+            )
+        return vectors
+
+    async def _abatch_embed(
+        self, texts: list[str], task_type: str
+    ) -> list[list[float]]:
+        client = _async_http_client.get()
+        if client is None:
+            # Called outside a session: open one just for this call.
+            async with async_http_client_session():
+                return await self._abatch_embed(texts, task_type)
+
+        vectors = []
+        for start in range(0, len(texts), MAX_BATCH_SIZE):
+            response = await self._apost(
+                client,
+                self._batch_request(texts[start : start + MAX_BATCH_SIZE], task_type),
+            )
+            vectors.extend(
+                embedding["values"] for embedding in response.json()["embeddings"]
+            )
+        return vectors
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self._batch_embed(texts, "RETRIEVAL_DOCUMENT")
+
+    def embed_query(self, text: str) -> list[float]:
+        return self._batch_embed([text], "RETRIEVAL_QUERY")[0]
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        return await self._abatch_embed(texts, "RETRIEVAL_DOCUMENT")
+
+    async def aembed_query(self, text: str) -> list[float]:
+        return (await self._abatch_embed([text], "RETRIEVAL_QUERY"))[0]
@@ -0,0 +1,460 @@
+import tempfile
+from collections import OrderedDict
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+import httpx
+from django.conf import settings
+from django.test import SimpleTestCase
+
+from LLMintegration import gemini_embeddings, vectorstore_utils
+from LLMintegration.embedding_cache import CachedEmbeddings
+from LLMintegration.vectorstore_utils import (
+    MAX_MERGED_CHUNK_CHARS,
+    MIN_CHUNK_CHARS,
+    ORIGINAL_DOC_ID_KEY,
+    _ChunkWriteBuffer,
+    _merge_small_chunks,
+    extract_unique_post_ids,
+)
+
+
+class MergeSmallChunksTests(SimpleTestCase):
+    def test_chunk_below_min_is_merged_into_previous(self):
+        chunks = ["a" * MIN_CHUNK_CHARS, "b" * (MIN_CHUNK_CHARS - 1)]
+        self.assertEqual(_merge_small_chunks(chunks), [" ".join(chunks)])
+
+    def test_previous_below_min_absorbs_next(self):
+        chunks = ["a" * (MIN_CHUNK_CHARS - 1), "b" * MIN_CHUNK_CHARS]
+        self.assertEqual(_merge_small_chunks(chunks), [" ".join(chunks)])
+
+    def test_chunks_at_min_are_kept_apart(self):
+        chunks = ["a" * MIN_CHUNK_CHARS, "b" * MIN_CHUNK_CHARS]
+        self.assertEqual(_merge_small_chunks(chunks), chunks)
+
+    def test_merge_up_to_max_merged_chars(self):
+        # +1 for the joining space
+        chunks = ["a" * 10, "b" * (MAX_MERGED_CHUNK_CHARS - 11)]
+        merged = _merge_small_chunks(chunks)
+        self.assertEqual(merged, [" ".join(chunks)])
+        self.assertEqual(len(merged[0]), MAX_MERGED_CHUNK_CHARS)
+
+    def test_no_merge_past_max_merged_chars(self):
+        chunks = ["a" * 10, "b" * (MAX_MERGED_CHUNK_CHARS - 10)]
+        self.assertEqual(_merge_small_chunks(chunks), chunks)
+
+    def test_empty_chunks_are_dropped(self):
+        self.assertEqual(_merge_small_chunks(["", "abc", ""]), ["abc"])
+
+
+class ChunkWriteBufferTests(SimpleTestCase):
+    def setUp(self):
+        self.collection = mock.Mock()
+        self.vector_store = SimpleNamespace(
+            _collection=self.collection, delete=mock.Mock()
+        )
+        patcher = mock.patch.object(
+            vectorstore_utils, "get_vector_store", return_value=self.vector_store
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # max_delay long enough that the timer never fires during a test
+        self.buffer = _ChunkWriteBuffer(max_chunks=3, max_delay=60)
+        self.addCleanup(self._cancel_timer)
+
+    def _cancel_timer(self):
+        if self.buffer._timer is not None:
+            self.buffer._timer.cancel()
+
+    def _add(self, *ids):
+        self.buffer.add(
+            list(ids),
+            [[0.1, 0.2]] * len(ids),
+            [{"post_id": 1}] * len(ids),
+            [f"text of {chunk_id}" for chunk_id in ids],
+        )
+
+    def test_below_threshold_waits_for_timer(self):
+        self._add("a", "b")
+        self.collection.upsert.assert_not_called()
+        self.assertIsNotNone(self.buffer._timer)
+
+    def test_flushes_on_threshold(self):
+        self._add("a", "b")
+        self._add("c")
+        self.collection.upsert.assert_called_once()
+        self.assertEqual(
+            self.collection.upsert.call_args.kwargs["ids"], ["a", "b", "c"]
+        )
+        self.assertEqual(self.buffer._pending, {})
+        self.assertIsNone(self.buffer._timer)
+
+    def test_re_added_chunk_replaces_pending_version(self):
+        self._add("a", "b")
+        self.buffer.add(["a"], [[0.3, 0.4]], [{"post_id": 1}], ["new text"])
+        self.buffer.flush()
+        kwargs = self.collection.upsert.call_args.kwargs
+        self.assertEqual(kwargs["ids"], ["a", "b"])
+        self.assertEqual(kwargs["documents"], ["new text", "text of b"])
+
+    def test_flush_raises_when_write_fails(self):
+        self.collection.upsert.side_effect = RuntimeError("disk full")
+        self._add("a")
+        with self.assertRaises(RuntimeError):
+            self.buffer.flush()
+
+    def test_flush_and_record_keeps_error_for_bulk_caller(self):
+        self.collection.upsert.side_effect = RuntimeError("disk full")
+        self._add("a")
+        self.buffer.flush_and_record()
+        self.assertIsInstance(self.buffer.take_recorded_error(), RuntimeError)
+        # handed out once
+        self.assertIsNone(self.buffer.take_recorded_error())
+
+    def test_write_now_ignores_recorded_error_and_drops_older_pending_version(self):
+        self.collection.upsert.side_effect = RuntimeError("disk full")
+        self._add("x")
+        self.buffer.flush_and_record()
+        self.collection.upsert.side_effect = None
+        self._add("a", "b")
+
+        self.buffer.write_now(["a"], [[0.3, 0.4]], [{"post_id": 1}], ["new text"])
+
+        self.assertEqual(self.collection.upsert.call_args.kwargs["ids"], ["a"])
+        self.assertEqual(list(self.buffer._pending), ["b"])
+        self.assertIsNotNone(self.buffer.take_recorded_error())
+
+    def test_delete_runs_when_pre_flush_fails(self):
+        self.collection.upsert.side_effect = RuntimeError("disk full")
+        self._add("comment_1_chunk_0")
+        with mock.patch.object(vectorstore_utils, "_write_buffer", self.buffer):
+            vectorstore_utils.delete_document_from_vectorstore("post_5", 1)
+        self.vector_store.delete.assert_called_once_with(ids=["post_5_chunk_0"])
+        self.assertIsNotNone(self.buffer.take_recorded_error())
+
+
+def _chunk(**metadata):
+    return SimpleNamespace(metadata=metadata)
+
+
+class ExtractUniquePostIdsTests(SimpleTestCase):
+    def test_unique_ids_in_order_of_first_appearance(self):
+        chunks = [_chunk(post_id=7), _chunk(post_id=3), _chunk(post_id=7)]
+        self.assertEqual(extract_unique_post_ids(chunks), [7, 3])
+
+    def test_legacy_string_post_id_is_cast_to_int(self):
+        chunks = [_chunk(post_id="3"), _chunk(post_id=3)]
+        self.assertEqual(extract_unique_post_ids(chunks), [3])
+
+    def test_legacy_post_chunk_resolved_from_original_doc_id(self):
+        chunks = [_chunk(**{ORIGINAL_DOC_ID_KEY: "post_5"}), _chunk(post_id=5)]
+        self.assertEqual(extract_unique_post_ids(chunks), [5])
+
+    def test_unresolvable_chunks_are_skipped(self):
+        chunks = [
+            SimpleNamespace(metadata=None),
+            _chunk(post_id="not-a-number"),
+            # a legacy comment chunk without post_id can't be mapped to its post
+            _chunk(**{ORIGINAL_DOC_ID_KEY: "comment_4"}),
+            _chunk(post_id=2),
+        ]
+        self.assertEqual(extract_unique_post_ids(chunks), [2])
+
+
+class _CountingEmbeddings:
+    """Embeds a text as [len(text), 1.0] and records every batch it is asked for."""
+
+    def __init__(self):
+        self.calls = []
+
+    def embed_documents(self, texts):
+        self.calls.append(list(texts))
+        return [[float(len(text)), 1.0] for text in texts]
+
+
+class CachedEmbeddingsTests(SimpleTestCase):
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.cache_path = Path(tmp_dir.name) / "emb_cache.sqlite"
+        self.inner = _CountingEmbeddings()
+
+    def _cache(self, **kwargs):
+        cache = CachedEmbeddings(
+            self.inner, model_name="test-model", cache_path=self.cache_path, **kwargs
+        )
+        self.addCleanup(cache._connection.close)
+        return cache
+
+    def test_misses_are_deduplicated_and_results_keep_input_order(self):
+        vectors = self._cache().embed_documents(["a", "bb", "a"])
+        self.assertEqual(self.inner.calls, [["a", "bb"]])
+        self.assertEqual(vectors, [[1.0, 1.0], [2.0, 1.0], [1.0, 1.0]])
+
+    def test_only_misses_are_embedded(self):
+        cache = self._cache()
+        cache.embed_documents(["bb"])
+        vectors = cache.embed_documents(["ccc", "bb"])
+        self.assertEqual(self.inner.calls, [["bb"], ["ccc"]])
+        self.assertEqual(vectors, [[3.0, 1.0], [2.0, 1.0]])
+
+    def test_hits_from_disk_survive_a_new_instance(self):
+        self._cache().embed_documents(["a", "bb"])
+        vectors = self._cache().embed_documents(["bb", "a"])
+        self.assertEqual(self.inner.calls, [["a", "bb"]])
+        self.assertEqual(vectors, [[2.0, 1.0], [1.0, 1.0]])
+
+    def test_disk_cache_prunes_least_recently_written(self):
+        cache = self._cache(memory_cache_size=0, max_disk_entries=2)
+        for text in ["a", "bb", "ccc"]:
+            cache.embed_documents([text])
+        cache.embed_documents(["a", "ccc"])
+        self.assertEqual(self.inner.calls[-1], ["a"])
+
+
+class SemanticSearchFetchLoopTests(SimpleTestCase):
+    def setUp(self):
+        for name, value in [
+            ("get_vector_store", mock.Mock()),
+            ("embed_query_cached", [0.1, 0.2]),
+        ]:
+            patcher = mock.patch.object(vectorstore_utils, name, return_value=value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _search(self, chunks_for_k, **kwargs):
+        """Runs semantic_search with chunks_for_k(k) as the collection's answer; returns (result, ks)."""
+        with mock.patch.object(
+            vectorstore_utils,
+            "_similarity_search_by_vector",
+            side_effect=lambda store, vector, k: chunks_for_k(k),
+        ) as search:
+            result = vectorstore_utils.semantic_search("dorm laundry rules", **kwargs)
+        return result, [call.args[2] for call in search.call_args_list]
+
+    def test_stops_when_enough_unique_posts(self):
+        result, ks = self._search(
+            lambda k: [_chunk(post_id=i) for i in range(k)], limit=2
+        )
+        self.assertEqual(result, [0, 1])
+        self.assertEqual(ks, [6])
+
+    def test_stops_when_collection_exhausted(self):
+        result, ks = self._search(
+            lambda k: [_chunk(post_id=1), _chunk(post_id=2)], limit=20
+        )
+        self.assertEqual(result, [1, 2])
+        self.assertEqual(ks, [60])
+
+    def test_doubles_k_up_to_the_cap(self):
+        # every chunk belongs to the same post, so the target is never reached
+        result, ks = self._search(
+            lambda k: [_chunk(post_id=1)] * k, limit=20, offset=100
+        )
+        self.assertEqual(result, [])
+        self.assertEqual(ks, [160, 320, 600])
+
+    def test_short_query_skips_search(self):
+        with mock.patch.object(
+            vectorstore_utils, "_similarity_search_by_vector"
+        ) as search:
+            self.assertEqual(vectorstore_utils.semantic_search(" a "), [])
+        search.assert_not_called()
+
+
+class SearchByVectorGuardTests(SimpleTestCase):
+    def test_unusable_vectors_return_empty_without_searching(self):
+        with mock.patch.object(vectorstore_utils, "get_vector_store") as store:
+            for vector in (
+                None,
+                [],
+                [0.0, 0.0],
+                [float("nan"), 1.0],
+                [[1.0], [1.0, 2.0]],
+                ["x"],
+            ):
+                with self.subTest(vector=vector):
+                    self.assertEqual(vectorstore_utils.search_by_vector(vector), [])
+        store.assert_not_called()
+
+
+def _response(status_code, **kwargs):
+    request = httpx.Request("POST", "https://example.invalid/embed")
+    return httpx.Response(status_code, request=request, **kwargs)
+
+
+class GeminiEmbeddingsRetryTests(SimpleTestCase):
+    def setUp(self):
+        self.client = mock.Mock()
+        client_patcher = mock.patch.object(
+            gemini_embeddings, "get_http_client", return_value=self.client
+        )
+        client_patcher.start()
+        self.addCleanup(client_patcher.stop)
+        sleep_patcher = mock.patch.object(gemini_embeddings.time, "sleep")
+        self.sleep = sleep_patcher.start()
+        self.addCleanup(sleep_patcher.stop)
+        self.embeddings = gemini_embeddings.GeminiEmbeddings(
+            model="models/embedding-001", google_api_key="test-key"
+        )
+
+    def test_retries_rate_limit_honoring_retry_after(self):
+        self.client.post.side_effect = [
+            _response(429, headers={"Retry-After": "3"}),
+            _response(503),
+            _response(200, json={"embeddings": [{"values": [1.0, 2.0]}]}),
+        ]
+        self.assertEqual(self.embeddings.embed_documents(["a"]), [[1.0, 2.0]])
+        sleeps = [call.args[0] for call in self.sleep.call_args_list]
+        self.assertEqual(sleeps, [3.0, gemini_embeddings.RETRY_BACKOFF_SECONDS * 2])
+
+    def test_gives_up_after_max_retries(self):
+        self.client.post.return_value = _response(503)
+        with self.assertRaises(httpx.HTTPStatusError):
+            self.embeddings.embed_documents(["a"])
+        self.assertEqual(self.client.post.call_count, gemini_embeddings.MAX_RETRIES + 1)
+
+    def test_client_errors_are_not_retried(self):
+        self.client.post.return_value = _response(400)
+        with self.assertRaises(httpx.HTTPStatusError):
+            self.embeddings.embed_documents(["a"])
+        self.assertEqual(self.client.post.call_count, 1)
+
+
+class DeleteByChunkIdTests(SimpleTestCase):
+    def setUp(self):
+        self.vector_store = mock.Mock()
+        for name, kwargs in [
+            ("get_vector_store", {"return_value": self.vector_store}),
+            ("_write_buffer", {"new": mock.Mock()}),
+        ]:
+            patcher = mock.patch.object(vectorstore_utils, name, **kwargs)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_delete_with_known_count_goes_by_id(self):
+        vectorstore_utils.delete_document_from_vectorstore("post_5", 3)
+        self.vector_store.delete.assert_called_once_with(
+            ids=["post_5_chunk_0", "post_5_chunk_1", "post_5_chunk_2"]
+        )
+
+    def test_delete_without_count_uses_metadata_filter(self):
+        vectorstore_utils.delete_document_from_vectorstore("post_5")
+        self.vector_store.delete.assert_called_once_with(
+            where={ORIGINAL_DOC_ID_KEY: "post_5"}
+        )
+
+    def test_stale_chunks_deleted_by_id(self):
+        vectorstore_utils.delete_stale_chunks_from_vectorstore("post_5", 1, 3)
+        self.vector_store.delete.assert_called_once_with(
+            ids=["post_5_chunk_1", "post_5_chunk_2"]
+        )
+
+    def test_no_stale_chunks_when_not_shorter(self):
+        vectorstore_utils.delete_stale_chunks_from_vectorstore("post_5", 3, 3)
+        self.vector_store.delete.assert_not_called()
+
+    def test_stale_chunks_of_legacy_row_use_metadata_filter(self):
+        vectorstore_utils.delete_stale_chunks_from_vectorstore("post_5", 1)
+        where = self.vector_store.delete.call_args.kwargs["where"]
+        self.assertIn({ORIGINAL_DOC_ID_KEY: "post_5"}, where["$and"])
+
+
+class _DictCache:
+    """Minimal stand-in for a Django cache backend."""
+
+    def __init__(self):
+        self.data = {}
+        self.timeouts = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, timeout):
+        self.data[key] = value
+        self.timeouts[key] = timeout
+
+
+class QueryEmbeddingCacheTestMixin:
+    def setUp(self):
+        self.now = 1000.0
+        self.shared_cache = _DictCache()
+        self.embedder = mock.Mock()
+        self.embedder.embed_query.side_effect = lambda query: [float(len(query))]
+        for target, name, kwargs in [
+            (vectorstore_utils, "_query_emb_cache", {"new": OrderedDict()}),
+            (vectorstore_utils, "QUERY_EMBEDDING_CACHE_SIZE", {"new": 2}),
+            (
+                vectorstore_utils,
+                "caches",
+                {
+                    "new": {
+                        vectorstore_utils.QUERY_EMBEDDING_CACHE_ALIAS: self.shared_cache
+                    }
+                },
+            ),
+            (
+                vectorstore_utils,
+                "get_embedding_function",
+                {"return_value": self.embedder},
+            ),
+            (vectorstore_utils.time, "monotonic", {"side_effect": lambda: self.now}),
+        ]:
+            patcher = mock.patch.object(target, name, **kwargs)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _embedded_queries(self):
+        return [call.args[0] for call in self.embedder.embed_query.call_args_list]
+
+
+class QueryEmbeddingLruTests(QueryEmbeddingCacheTestMixin, SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        # Never hit the shared tier, so only the in-process LRU is exercised.
+        self.shared_cache.get = lambda key: None
+
+    def test_repeated_query_within_ttl_is_embedded_once(self):
+        first = vectorstore_utils.embed_query_cached("laundry")
+        self.now += vectorstore_utils.QUERY_EMBEDDING_CACHE_TTL_SECONDS - 1
+        self.assertEqual(vectorstore_utils.embed_query_cached("laundry"), first)
+        self.assertEqual(self._embedded_queries(), ["laundry"])
+
+    def test_expired_entry_is_embedded_again(self):
+        vectorstore_utils.embed_query_cached("laundry")
+        self.now += vectorstore_utils.QUERY_EMBEDDING_CACHE_TTL_SECONDS
+        vectorstore_utils.embed_query_cached("laundry")
+        self.assertEqual(self._embedded_queries(), ["laundry", "laundry"])
+
+    def test_least_recently_used_entry_is_evicted(self):
+        for query in ["wifi", "laundry", "wifi", "parking"]:
+            vectorstore_utils.embed_query_cached(query)
+        # "wifi" was used after "laundry", so "laundry" is the one evicted
+        vectorstore_utils.embed_query_cached("wifi")
+        vectorstore_utils.embed_query_cached("laundry")
+        self.assertEqual(
+            self._embedded_queries(), ["wifi", "laundry", "parking", "laundry"]
+        )
+
+
+class SharedQueryEmbeddingCacheTests(QueryEmbeddingCacheTestMixin, SimpleTestCase):
+    def test_other_worker_reuses_shared_embedding(self):
+        first = vectorstore_utils.embed_query_cached("laundry")
+        # a different worker process starts with an empty in-process LRU
+        vectorstore_utils._query_emb_cache.clear()
+        self.assertEqual(vectorstore_utils.embed_query_cached("laundry"), first)
+        self.assertEqual(self._embedded_queries(), ["laundry"])
+
+    def test_shared_entry_outlives_in_process_ttl(self):
+        vectorstore_utils.embed_query_cached("laundry")
+        self.now += vectorstore_utils.QUERY_EMBEDDING_CACHE_TTL_SECONDS
+        vectorstore_utils.embed_query_cached("laundry")
+        self.assertEqual(self._embedded_queries(), ["laundry"])
+
+    def test_shared_entry_uses_configured_timeout(self):
+        vectorstore_utils.embed_query_cached("laundry")
+        self.assertEqual(
+            list(self.shared_cache.timeouts.values()),
+            [settings.QUERY_EMBEDDING_CACHE_TIMEOUT],
+        )
@@ -6,20 +6,50 @@ What it does:
 3. Add each chunk to the vector store with metadata linking it to the original document ID (i.e. post_32) and chunk index (2 meaning 3rd chunk). To uniquely identify chunks in the ChromaDB, we combine them. (e.g., post_32_chunk_2).
 4. Implemented a delete function that removes ALL chunks associated with a given original document ID (i.e. post_32).
 5. Implemented a search function that retrieves chunks based on a query with all metadata intact, allowing you to trace back to the original document and chunk index/sequence.
+6. add_documents_to_vectorstore ingests many documents at once: chunks of the whole batch are embedded together (one API call per EMBEDDING_BATCH_SIZE chunks) and written to Chroma in one call.
+7. aadd_documents is the asyncio variant: embedding requests of a batch are fanned out with asyncio.gather (bounded by settings.EMBEDDING_CONCURRENCY).
+8. aadd_documents writes through a buffer that upserts to Chroma every WRITE_BUFFER_MAX_CHUNKS chunks or WRITE_BUFFER_MAX_DELAY_SECONDS seconds, whichever comes first. Deletes flush it first.
+   Both ingest functions return only once their chunks are in Chroma, and None if anything failed.
 """
 
+import asyncio
+import atexit
+import hashlib
 import logging
+import re
+import threading
+import time
+from collections import OrderedDict
 
+import chromadb
+import numpy as np
 from django.conf import settings
+from django.core.cache import caches
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_chroma import Chroma
 from langchain_core.documents import Document
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
+# Optional: _get_text_splitter falls back to RecursiveCharacterTextSplitter without it
+try:
+    from semantic_text_splitter import TextSplitter as RustTextSplitter
+except ImportError:
+    RustTextSplitter = None
+
+from .embedding_cache import CachedEmbeddings
+from .gemini_embeddings import GeminiEmbeddings, async_http_client_session
 
 logger = logging.getLogger(__name__)
 
 _embedding_function = None
 _vector_store = None
+_text_splitter = None
+_init_lock = threading.RLock()
+# query -> (monotonic time embedded, embedding), oldest first
+_query_emb_cache: OrderedDict[str, tuple[float, list[float]]] = OrderedDict()
+_query_emb_cache_lock = threading.Lock()
+
+EMBEDDING_MODEL_NAME = "models/embedding-001"
+EMBEDDING_CACHE_FILENAME = "emb_cache.sqlite"  # stored inside CHROMA_PERSIST_DIRECTORY
 
 # --- Configuration for Chunking ---
 
@@ -28,22 +58,54 @@ FALLBACK_CHUNK_SIZE_CHARS = 6144  # if 1 token ~ 3 chars, 2048 tokens ~ 6144 cha
 FALLBACK_CHUNK_OVERLAP_CHARS = max(
     0, FALLBACK_CHUNK_SIZE_CHARS // 5
 )  # e.g., ~20% overlap, ensure non-negative # characters
-# Metadata keys for linking chunks to original documents
+# Chunks shorter than this are merged into a neighbour, up to MAX_MERGED_CHUNK_CHARS (~MAX_TOKENS tokens)
+MIN_CHUNK_CHARS = 400
+MAX_MERGED_CHUNK_CHARS = MAX_TOKENS * 3
+_WHITESPACE_RE = re.compile(r"\s+")
+# Metadata keys for linking chunks to original documents.
+# Chroma keeps chunk metadata in SQLite with (key, value) indexes per value type, so equality filters
+# on these keys (e.g. deleting by original_doc_id) are index lookups, not collection scans.
 ORIGINAL_DOC_ID_KEY = "original_doc_id"
 CHUNK_INDEX_KEY = "chunk_index"
+# Max number of texts sent to the embedding API in one embed_documents call (provider batch limit)
+EMBEDDING_BATCH_SIZE = 100
+# Chunks are buffered and written to Chroma once this many are pending or after this many seconds
+WRITE_BUFFER_MAX_CHUNKS = 512
+WRITE_BUFFER_MAX_DELAY_SECONDS = 2.0
+
+# Queries shorter than this (after stripping) return no results without calling the embedding API
+MIN_QUERY_CHARS = 3
+QUERY_EMBEDDING_CACHE_SIZE = 512
+QUERY_EMBEDDING_CACHE_TTL_SECONDS = 15 * 60
+# settings.CACHES alias shared by all worker processes
+QUERY_EMBEDDING_CACHE_ALIAS = "query_embeddings"
+
+# --- Configuration for semantic_search pagination ---
+# Chunks fetched per requested post ID in the first round (later rounds double k), and the hard cap of (offset + limit) * 5 chunks
+SEMANTIC_SEARCH_FETCH_MULTIPLIER = 3
+SEMANTIC_SEARCH_MAX_FETCH_MULTIPLIER = 5
 
 
 def get_embedding_function():
     """Initializes and returns the Google Generative AI embedding function."""
     global _embedding_function
     if _embedding_function is None:
-        logger.info("Initializing Google Generative AI embedding model.")
-        _embedding_function = GoogleGenerativeAIEmbeddings(
-            # model="text-multilingual-embedding-002",
-            model="models/embedding-001",
-            google_api_key=settings.EMBEDDING_API_KEY,
-        )
-        logger.info("Google Generative AI embedding model initialized.")
+        # Lock so concurrent first calls (warm-up thread, request threads) initialize it only once.
+        with _init_lock:
+            if _embedding_function is None:
+                logger.info("Initializing Google Generative AI embedding model.")
+                # Document embeddings are cached by content hash so unchanged chunks never hit the API twice.
+                _embedding_function = CachedEmbeddings(
+                    GeminiEmbeddings(
+                        # model="text-multilingual-embedding-002",
+                        model=EMBEDDING_MODEL_NAME,
+                        google_api_key=settings.EMBEDDING_API_KEY,
+                    ),
+                    model_name=EMBEDDING_MODEL_NAME,
+                    cache_path=settings.CHROMA_PERSIST_DIRECTORY
+                    / EMBEDDING_CACHE_FILENAME,
+                )
+                logger.info("Google Generative AI embedding model initialized.")
     return _embedding_function
 
 
@@ -51,103 +113,450 @@ def get_vector_store():
     """Initializes and returns the Chroma vector store."""
     global _vector_store
     if _vector_store is None:
-        embedding_function = get_embedding_function()
-        logger.info(
-            f"Initializing Chroma vector store at: {settings.CHROMA_PERSIST_DIRECTORY}"
-        )
-        _vector_store = Chroma(
-            collection_name="dormitory_content",  # Consider making this configurable via settings
-            embedding_function=embedding_function,
-            persist_directory=str(settings.CHROMA_PERSIST_DIRECTORY),
-        )
-        logger.info("Chroma vector store initialized.")
+        # Lock so concurrent first calls (warm-up thread, request threads) initialize it only once.
+        with _init_lock:
+            if _vector_store is None:
+                embedding_function = get_embedding_function()
+                logger.info(
+                    f"Initializing Chroma vector store at: {settings.CHROMA_PERSIST_DIRECTORY}"
+                )
+                # Explicit PersistentClient: SQLite + HNSW segment persistence, no telemetry.
+                client = chromadb.PersistentClient(
+                    path=str(settings.CHROMA_PERSIST_DIRECTORY),
+                    settings=chromadb.Settings(
+                        is_persistent=True, anonymized_telemetry=False
+                    ),
+                )
+                _vector_store = Chroma(
+                    collection_name="dormitory_content",  # Consider making this configurable via settings
+                    embedding_function=embedding_function,
+                    client=client,
+                    # Only applied when the collection is created; an existing collection keeps its settings.
+                    collection_metadata={
+                        "hnsw:space": "cosine",
+                        "hnsw:M": settings.CHROMA_HNSW_M,
+                        "hnsw:construction_ef": settings.CHROMA_HNSW_CONSTRUCTION_EF,
+                        "hnsw:search_ef": settings.CHROMA_HNSW_SEARCH_EF,
+                    },
+                )
+                logger.info("Chroma vector store initialized.")
     return _vector_store
 
 
-def _get_text_splitter():
+def warm_up_vectorstore():
     """
-    Initializes and returns a character-based text splitter.
+    Initializes the embedding client and the Chroma vector store and runs one dummy search,
+    so the first real query after server start doesn't pay for loading them.
+    Called once from LlmintegrationConfig.ready().
     """
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=FALLBACK_CHUNK_SIZE_CHARS,
-        chunk_overlap=FALLBACK_CHUNK_OVERLAP_CHARS,
-        length_function=len,
-        is_separator_regex=False,
-    )
-    logger.info(
-        f"Using character-based splitting. Chunk size: {FALLBACK_CHUNK_SIZE_CHARS} chars, "
-        f"Overlap: {FALLBACK_CHUNK_OVERLAP_CHARS} chars."
-    )
-    return text_splitter
+    try:
+        get_embedding_function()
+        get_vector_store().similarity_search("warmup", k=1)
+        logger.info("Vector store warmed up.")
+    except Exception as e:
+        logger.error(f"Error warming up vector store: {e}", exc_info=True)
 
 
-def add_document_to_vectorstore(
-    original_doc_id: str, text_content: str, metadata: dict
-):  # like post_32, text_content, metadata dict containing source_type, document_id, author_username, created_at, url
+class _RustTextSplitter:
     """
-    Splits a document into chunks and adds them to the vector store.
-    Each chunk is associated with the original document ID and includes original metadata.
+    Thin adapter around semantic-text-splitter's Rust TextSplitter exposing the same
+    split_text(text) -> list[str] interface as LangChain's splitters.
     """
-    try:
-        if not text_content or not text_content.strip():
-            logger.warning(
-                f"Text content for document {original_doc_id} is empty or whitespace only. Skipping."
-            )
-            return
 
-        vector_store = get_vector_store()
-        text_splitter = _get_text_splitter()
+    def __init__(self, chunk_size: int, chunk_overlap: int):
+        self._splitter = RustTextSplitter(chunk_size, overlap=chunk_overlap)
+
+    def split_text(self, text: str) -> list[str]:
+        return self._splitter.chunks(text)
 
-        text_chunks = text_splitter.split_text(text_content)
 
-        if not text_chunks:
-            logger.warning(
-                f"No text chunks generated for document {original_doc_id} (original_doc_id). Content might be too short after splitting attempt."
+def _get_text_splitter():
+    """
+    Initializes (once) and returns a character-based text splitter.
+    Uses the Rust-backed semantic-text-splitter when available and enabled via
+    settings.USE_RUST_TEXT_SPLITTER, otherwise LangChain's RecursiveCharacterTextSplitter.
+    The splitter is stateless, so a single instance is shared by all ingest calls.
+    """
+    global _text_splitter
+    if _text_splitter is None:
+        if settings.USE_RUST_TEXT_SPLITTER and RustTextSplitter is not None:
+            _text_splitter = _RustTextSplitter(
+                chunk_size=FALLBACK_CHUNK_SIZE_CHARS,
+                chunk_overlap=FALLBACK_CHUNK_OVERLAP_CHARS,
             )
-            return
+            splitter_name = "semantic-text-splitter (Rust)"
+        else:
+            if settings.USE_RUST_TEXT_SPLITTER:
+                logger.warning(
+                    "semantic-text-splitter is not installed. Falling back to RecursiveCharacterTextSplitter."
+                )
+            _text_splitter = RecursiveCharacterTextSplitter(
+                chunk_size=FALLBACK_CHUNK_SIZE_CHARS,
+                chunk_overlap=FALLBACK_CHUNK_OVERLAP_CHARS,
+                length_function=len,
+                is_separator_regex=False,
+            )
+            splitter_name = "RecursiveCharacterTextSplitter"
+        logger.info(
+            f"Using character-based splitting with {splitter_name}. Chunk size: {FALLBACK_CHUNK_SIZE_CHARS} chars, "
+            f"Overlap: {FALLBACK_CHUNK_OVERLAP_CHARS} chars."
+        )
+    return _text_splitter
 
-        documents_to_add = []
-        chunk_ids_for_db = []
 
-        for i, chunk_text in enumerate(text_chunks):
-            # Create a unique ID for each chunk to store in Chroma
-            chunk_db_id = f"{original_doc_id}_chunk_{i}"
+def _merge_small_chunks(chunks) -> list[str]:
+    """
+    Greedily merges adjacent chunks while either side is shorter than MIN_CHUNK_CHARS and the
+    result stays within MAX_MERGED_CHUNK_CHARS. Empty chunks are dropped.
+    """
+    merged = []
+    for chunk in chunks:
+        if not chunk:
+            continue
+        if (
+            merged
+            and (len(merged[-1]) < MIN_CHUNK_CHARS or len(chunk) < MIN_CHUNK_CHARS)
+            and len(merged[-1]) + 1 + len(chunk) <= MAX_MERGED_CHUNK_CHARS
+        ):
+            merged[-1] = f"{merged[-1]} {chunk}"
+        else:
+            merged.append(chunk)
+    return merged
 
-            # Combine original metadata with chunk-specific metadata
-            chunk_metadata = {
+
+def _chunk_id(original_doc_id: str, chunk_index: int) -> str:
+    """Deterministic Chroma ID of a chunk, e.g. post_32_chunk_2."""
+    return f"{original_doc_id}_chunk_{chunk_index}"
+
+
+def _build_chunks(original_doc_id: str, text_content: str, metadata: dict):
+    """
+    Splits a document into chunks and returns the parallel lists (chunk_ids, chunk_texts, chunk_metadatas)
+    that are written to Chroma. Returns empty lists if nothing should be stored.
+    """
+    if not text_content or not text_content.strip():
+        logger.warning(
+            f"Text content for document {original_doc_id} is empty or whitespace only. Skipping."
+        )
+        return [], [], []
+
+    text_splitter = _get_text_splitter()
+    # Normalize whitespace and fold tiny splitter leftovers into their neighbours, so no embedding
+    # call is spent on whitespace or context-poor slivers. Chunk indexes follow the merged list.
+    text_chunks = _merge_small_chunks(
+        _WHITESPACE_RE.sub(" ", chunk).strip()
+        for chunk in text_splitter.split_text(text_content)
+    )
+
+    if not text_chunks:
+        logger.warning(
+            f"No text chunks generated for document {original_doc_id} (original_doc_id). Content might be too short after splitting attempt."
+        )
+        return [], [], []
+
+    chunk_ids = []
+    chunk_metadatas = []
+    for i in range(len(text_chunks)):
+        # Create a unique ID for each chunk to store in Chroma
+        chunk_ids.append(_chunk_id(original_doc_id, i))
+        # Combine original metadata with chunk-specific metadata
+        chunk_metadatas.append(
+            {
                 **metadata,  # Original metadata passed to the function
                 ORIGINAL_DOC_ID_KEY: original_doc_id,  # Link to the parent document # this will be used to trace back to the original document, and while deleting
                 CHUNK_INDEX_KEY: i,  # Sequence of the chunk
             }
+        )
+    return chunk_ids, text_chunks, chunk_metadatas
 
-            doc = Document(page_content=chunk_text, metadata=chunk_metadata)
-            documents_to_add.append(doc)
-            chunk_ids_for_db.append(chunk_db_id)
 
-        if documents_to_add:
-            vector_store.add_documents(documents=documents_to_add, ids=chunk_ids_for_db)
-            logger.info(
-                f"{len(documents_to_add)} chunks for document {original_doc_id} added to vector store."
+def _embed_in_batches(texts: list[str]) -> list[list[float]]:
+    """Embeds texts with one embed_documents call per EMBEDDING_BATCH_SIZE texts."""
+    embedding_function = get_embedding_function()
+    embeddings = []
+    for start in range(0, len(texts), EMBEDDING_BATCH_SIZE):
+        embeddings.extend(
+            embedding_function.embed_documents(
+                texts[start : start + EMBEDDING_BATCH_SIZE]
             )
-        else:
-            # This case should ideally be caught by 'if not text_chunks' earlier
-            logger.info(
-                f"No document chunks to add for {original_doc_id} after processing."
+        )
+    return embeddings
+
+
+class _ChunkWriteBuffer:
+    """
+    Collects chunks (with precomputed embeddings) and writes them to Chroma in one upsert once
+    max_chunks are pending or max_delay seconds after the first pending chunk, whichever comes first.
+    Chroma's per-write overhead (SQLite transaction + HNSW index persistence) is then paid once per batch
+    instead of once per document.
+
+    flush() raises if its write fails. Flushes made for someone who doesn't own the pending rows
+    (the timer, process exit, deletes) go through flush_and_record(), which keeps the error for the
+    bulk caller's next flush_vectorstore_writes() instead. write_now() bypasses the batching for
+    callers that need their own chunks written before they return.
+    """
+
+    def __init__(self, max_chunks: int, max_delay: float):
+        self.max_chunks = max_chunks
+        self.max_delay = max_delay
+        # chunk_id -> (embedding, metadata, text); a dict so re-adding a pending chunk replaces it
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._timer = None
+        self._recorded_error = None
+
+    def add(self, ids, embeddings, metadatas, texts):
+        with self._lock:
+            for row in zip(ids, embeddings, metadatas, texts):
+                self._pending[row[0]] = row[1:]
+            if len(self._pending) < self.max_chunks:
+                if self._timer is None:
+                    self._timer = threading.Timer(self.max_delay, self.flush_and_record)
+                    self._timer.daemon = True
+                    self._timer.start()
+                return
+        self.flush()
+
+    def flush(self):
+        # _write_lock keeps writes in the order their rows were taken, so an older version of a
+        # chunk can't overwrite a newer one written by a concurrent flush.
+        with self._write_lock:
+            with self._lock:
+                rows = self._take()
+            self._write(rows)
+
+    def flush_and_record(self):
+        # _write has already logged the failure.
+        try:
+            self.flush()
+        except Exception as e:
+            with self._lock:
+                self._recorded_error = e
+
+    def take_recorded_error(self):
+        """Returns (and clears) the error of the last failed flush_and_record(), if any."""
+        with self._lock:
+            error, self._recorded_error = self._recorded_error, None
+        return error
+
+    def write_now(self, ids, embeddings, metadatas, texts):
+        """Writes the given chunks immediately and raises if that fails. Pending rows stay buffered."""
+        rows = {row[0]: row[1:] for row in zip(ids, embeddings, metadatas, texts)}
+        with self._write_lock:
+            with self._lock:
+                # Older pending versions of these chunks must not be written after this newer one.
+                for chunk_id in rows:
+                    self._pending.pop(chunk_id, None)
+            self._write(rows)
+
+    def _take(self):
+        # Caller must hold self._lock.
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        rows = self._pending
+        self._pending = {}
+        return rows
+
+    def _write(self, rows):
+        if not rows:
+            return
+        try:
+            embeddings, metadatas, texts = zip(*rows.values())
+            # Precomputed embeddings go straight to the collection so Chroma doesn't embed again.
+            # upsert (same as LangChain's add_documents) so re-ingesting an edited document overwrites its chunks.
+            get_vector_store()._collection.upsert(
+                ids=list(rows),
+                embeddings=list(embeddings),
+                metadatas=list(metadatas),
+                documents=list(texts),
             )
+            logger.info(f"Flushed {len(rows)} chunks to vector store.")
+        except Exception as e:
+            logger.error(
+                f"Error writing {len(rows)} chunks to vector store: {e}", exc_info=True
+            )
+            raise
+
+
+_write_buffer = _ChunkWriteBuffer(
+    max_chunks=WRITE_BUFFER_MAX_CHUNKS, max_delay=WRITE_BUFFER_MAX_DELAY_SECONDS
+)
+# Don't lose buffered chunks when the process exits normally.
+atexit.register(_write_buffer.flush_and_record)
+
+
+def _upsert_chunks(
+    ids: list[str],
+    embeddings: list[list[float]],
+    metadatas: list[dict],
+    texts: list[str],
+):
+    """
+    Queues chunks with precomputed embeddings for writing to the collection.
+    Only for bulk ingest; flush_vectorstore_writes() must be called before relying on the write.
+    """
+    _write_buffer.add(ids, embeddings, metadatas, texts)
+
+
+def flush_vectorstore_writes():
+    """
+    Writes all buffered chunks to Chroma now (e.g. at the end of a bulk ingest).
+    Raises if this write failed, or if a timed or pre-delete flush of buffered chunks failed since the last call.
+    """
+    _write_buffer.flush()
+    error = _write_buffer.take_recorded_error()
+    if error is not None:
+        raise error
+
+
+def _build_batch_chunks(batch: list[tuple[str, str, dict]]):
+    """Chunks every document of a batch and flattens the results into (ids, texts, metadatas, chunk_counts)."""
+    all_ids, all_texts, all_metadatas = [], [], []
+    chunk_counts = {}
+    for original_doc_id, text_content, metadata in batch:
+        chunk_ids, chunk_texts, chunk_metadatas = _build_chunks(
+            original_doc_id, text_content, metadata
+        )
+        if not chunk_ids:
+            continue
+        all_ids.extend(chunk_ids)
+        all_texts.extend(chunk_texts)
+        all_metadatas.extend(chunk_metadatas)
+        chunk_counts[original_doc_id] = len(chunk_ids)
+    return all_ids, all_texts, all_metadatas, chunk_counts
+
+
+def add_documents_to_vectorstore(batch: list[tuple[str, str, dict]]) -> dict:
+    """
+    Batched version of add_document_to_vectorstore.
+    Chunks of all documents in the batch are flattened into one list, embedded with as few
+    embedding API calls as possible, and written to Chroma in a single call before returning.
+
+    Args:
+        batch (list[tuple[str, str, dict]]): (original_doc_id, text_content, metadata) tuples.
+
+    Returns:
+        dict[str, int] | None: Number of chunks stored per original_doc_id (documents that were skipped
+        are left out), or None if the batch could not be added.
+    """
+    try:
+        all_ids, all_texts, all_metadatas, chunk_counts = _build_batch_chunks(batch)
+        if not all_ids:
+            logger.info("No document chunks to add for this batch after processing.")
+            return {}
+
+        embeddings = _embed_in_batches(all_texts)
+        # Written right away, not buffered: the chunk counts returned here are stored by the signal handlers.
+        _write_buffer.write_now(all_ids, embeddings, all_metadatas, all_texts)
+        logger.info(
+            f"{len(all_ids)} chunks for {len(chunk_counts)} documents added to vector store."
+        )
+        return chunk_counts
 
     except Exception as e:
         logger.error(
-            f"Error adding document {original_doc_id} (chunked): {e}", exc_info=True
+            f"Error adding batch of {len(batch)} documents (chunked): {e}",
+            exc_info=True,
         )
+        return None
 
 
-def delete_document_from_vectorstore(original_doc_id: str):
+async def aadd_documents(batch: list[tuple[str, str, dict]]) -> dict:
+    """
+    Async version of add_documents_to_vectorstore: the batch's chunks are split into groups of
+    EMBEDDING_BATCH_SIZE and all groups are embedded concurrently with aembed_documents, at most
+    settings.EMBEDDING_CONCURRENCY requests at a time. Call it from sync code with
+    asgiref.sync.async_to_sync(aadd_documents)(batch).
+
+    Chunks go through the write buffer (upserts of at most WRITE_BUFFER_MAX_CHUNKS) and are flushed
+    before returning, so like add_documents_to_vectorstore the returned counts are for written chunks.
+
+    Returns:
+        dict[str, int] | None: Same as add_documents_to_vectorstore.
+    """
+    try:
+        all_ids, all_texts, all_metadatas, chunk_counts = _build_batch_chunks(batch)
+        if not all_ids:
+            logger.info("No document chunks to add for this batch after processing.")
+            return {}
+
+        embedding_function = get_embedding_function()
+        semaphore = asyncio.Semaphore(settings.EMBEDDING_CONCURRENCY)
+
+        async def embed_group(texts):
+            async with semaphore:
+                return await embedding_function.aembed_documents(texts)
+
+        # One HTTP/2 connection for the whole batch; the concurrent groups are multiplexed over it.
+        async with async_http_client_session():
+            groups = await asyncio.gather(
+                *(
+                    embed_group(all_texts[start : start + EMBEDDING_BATCH_SIZE])
+                    for start in range(0, len(all_texts), EMBEDDING_BATCH_SIZE)
+                )
+            )
+        embeddings = [vector for group in groups for vector in group]
+
+        # Chroma's local client is synchronous; run the write off the event loop.
+        await asyncio.to_thread(
+            _upsert_chunks, all_ids, embeddings, all_metadatas, all_texts
+        )
+        await asyncio.to_thread(flush_vectorstore_writes)
+        logger.info(
+            f"{len(all_ids)} chunks for {len(chunk_counts)} documents added to vector store (async)."
+        )
+        return chunk_counts
+
+    except Exception as e:
+        logger.error(
+            f"Error adding batch of {len(batch)} documents (chunked, async): {e}",
+            exc_info=True,
+        )
+        return None
+
+
+def add_document_to_vectorstore(
+    original_doc_id: str, text_content: str, metadata: dict
+):  # like post_32, text_content, metadata dict containing source_type, document_id, author_username, created_at, url
+    """
+    Splits a document into chunks and adds them to the vector store.
+    Each chunk is associated with the original document ID and includes original metadata.
+    Returns the number of chunks stored (0 if there was nothing to store), or None if adding failed.
+    """
+    chunk_counts = add_documents_to_vectorstore(
+        [(original_doc_id, text_content, metadata)]
+    )
+    if chunk_counts is None:
+        return None
+    return chunk_counts.get(original_doc_id, 0)
+
+
+def delete_document_from_vectorstore(original_doc_id: str, chunk_count: int = None):
     """
     Deletes all chunks associated with the given original document ID from the vector store.
+
+    Args:
+        original_doc_id (str): e.g. post_32.
+        chunk_count (int): Number of chunks stored for the document, if known. The chunk IDs are then
+            rebuilt and deleted directly; otherwise (legacy rows) chunks are matched by metadata.
     """
     try:
+        # Write pending chunks first so they can't be written after (and resurrect) the deleted document.
+        # A failed flush is logged and kept for the bulk ingest that owns those rows; the delete still runs.
+        _write_buffer.flush_and_record()
         vector_store = get_vector_store()
 
+        if chunk_count is not None:
+            chunk_ids = [_chunk_id(original_doc_id, i) for i in range(chunk_count)]
+            if chunk_ids:
+                vector_store.delete(ids=chunk_ids)
+            logger.info(
+                f"Deleted {len(chunk_ids)} chunks for document {original_doc_id} by ID from vector store."
+            )
+            return
+
         # Chroma's delete method can use a 'where' filter based on metadata.
         # This will delete all chunks that have 'original_doc_id' set to the provided ID.
         filter_criteria = {ORIGINAL_DOC_ID_KEY: original_doc_id}
@@ -167,6 +576,86 @@ def delete_document_from_vectorstore(original_doc_id: str):
         )
 
 
+def delete_stale_chunks_from_vectorstore(
+    original_doc_id: str, chunk_count: int, previous_chunk_count: int = None
+):
+    """
+    Deletes chunks left over from a previous, longer version of a re-ingested document
+    (chunk indexes >= chunk_count). Uses chunk IDs when previous_chunk_count is known,
+    otherwise a metadata filter on the chunk index.
+    """
+    try:
+        # See delete_document_from_vectorstore.
+        _write_buffer.flush_and_record()
+        vector_store = get_vector_store()
+
+        if previous_chunk_count is not None:
+            if previous_chunk_count > chunk_count:
+                vector_store.delete(
+                    ids=[
+                        _chunk_id(original_doc_id, i)
+                        for i in range(chunk_count, previous_chunk_count)
+                    ]
+                )
+                logger.info(
+                    f"Deleted {previous_chunk_count - chunk_count} stale chunks for document {original_doc_id}."
+                )
+            return
+
+        vector_store.delete(
+            where={
+                "$and": [
+                    {ORIGINAL_DOC_ID_KEY: original_doc_id},
+                    {CHUNK_INDEX_KEY: {"$gte": chunk_count}},
+                ]
+            }
+        )
+
+    except Exception as e:
+        logger.error(
+            f"Error deleting stale chunks for {original_doc_id}: {e}", exc_info=True
+        )
+
+
+def embed_query_cached(query: str) -> list[float]:
+    """
+    Embeds a search query, reusing the embedding of an identical query from the last
+    QUERY_EMBEDDING_CACHE_TTL_SECONDS (in-process LRU, at most QUERY_EMBEDDING_CACHE_SIZE entries),
+    or from the shared "query_embeddings" Django cache (settings.QUERY_EMBEDDING_CACHE_TIMEOUT).
+    Pagination and repeated searches then cost no embedding call.
+    """
+    now = time.monotonic()
+    with _query_emb_cache_lock:
+        entry = _query_emb_cache.get(query)
+        if entry is not None and now - entry[0] < QUERY_EMBEDDING_CACHE_TTL_SECONDS:
+            _query_emb_cache.move_to_end(query)
+            return entry[1]
+
+    # Second tier: the shared Django cache, so a later page served by another worker process
+    # reuses the embedding computed for page 1.
+    shared_cache = caches[QUERY_EMBEDDING_CACHE_ALIAS]
+    shared_key = (
+        "q:"
+        + hashlib.sha1(f"{EMBEDDING_MODEL_NAME}\0{query}".encode("utf-8")).hexdigest()
+    )
+    embedding = shared_cache.get(shared_key)
+    if embedding is None:
+        embedding = get_embedding_function().embed_query(query)
+        shared_cache.set(shared_key, embedding, settings.QUERY_EMBEDDING_CACHE_TIMEOUT)
+
+    with _query_emb_cache_lock:
+        _query_emb_cache[query] = (now, embedding)
+        _query_emb_cache.move_to_end(query)
+        while len(_query_emb_cache) > QUERY_EMBEDDING_CACHE_SIZE:
+            _query_emb_cache.popitem(last=False)
+    return embedding
+
+
+def _is_query_too_short(query: str) -> bool:
+    """True for queries that can't produce a meaningful search (None, blank or under MIN_QUERY_CHARS)."""
+    return not query or len(query.strip()) < MIN_QUERY_CHARS
+
+
 def search_vectorstore(
     query: str, k: int = 5, fetch_k: int = 10, lambda_mult: float = 0.5
 ):  # k means how many chunks to return, fetch_k is how many chunks to fetch before MMR filtering, lambda_mult is the trade-off between relevance and diversity (1.0 means only relevance, 0.0 means only diversity, default is 0.5 which balances both)
@@ -176,15 +665,21 @@ def search_vectorstore(
     The metadata of each chunk contains ORIGINAL_DOC_ID_KEY and CHUNK_INDEX_KEY
     to link back to the original post/comment.
     """
+    if _is_query_too_short(query):
+        logger.debug("Query is empty or too short, skipping vector store search.")
+        return []
     try:
-        vector_store = get_vector_store()
         logger.info(
             f"Searching vector store with MMR for query"  #: '{query}', k={k}, fetch_k={fetch_k}, lambda_mult={lambda_mult}"
         )
 
-        # Perform MMR search. Results will be Document objects representing chunks.
-        results = vector_store.max_marginal_relevance_search(
-            query=query, k=k, fetch_k=fetch_k, lambda_mult=lambda_mult
+        # Perform MMR search with the (cached) query embedding. Results will be Document objects representing chunks.
+        results = search_by_vector(
+            embed_query_cached(query),
+            k=k,
+            fetch_k=fetch_k,
+            lambda_mult=lambda_mult,
+            use_mmr=True,
         )
 
         # print("RESULTS PRINTING--------------------------------")
@@ -209,95 +704,92 @@ def search_vectorstore(
         return []
 
 
+def _chunk_post_id(metadata) -> int | None:
+    """
+    Returns the Post ID a chunk belongs to, or None if it can't be determined.
+    Chunks written before post_id became an int may carry it as a string ("32"), and post chunks
+    from before post_id was added only have their original_doc_id (post_<id>); both are resolved
+    until the backfill_vectorstore command has re-ingested them.
+    """
+    if not metadata:
+        return None
+    try:
+        if metadata.get("post_id") is not None:
+            return int(metadata["post_id"])
+        original_doc_id = metadata.get(ORIGINAL_DOC_ID_KEY)
+        if original_doc_id and original_doc_id.startswith("post_"):
+            return int(original_doc_id.split("_")[1])
+    except (TypeError, ValueError):
+        logger.warning(
+            f"Could not parse post ID from metadata post_id: '{metadata.get('post_id')}' "
+            f"or original_doc_id: '{metadata.get(ORIGINAL_DOC_ID_KEY)}'"
+        )
+    return None
+
+
+def extract_unique_post_ids(chunks) -> list[int]:
+    """
+    Maps document chunks to their Post IDs, returning unique int IDs in order of first appearance.
+    Post/comment/reply chunks carry their parent post's ID under "post_id" (see _chunk_post_id for legacy chunks).
+    """
+    post_ids = (_chunk_post_id(chunk.metadata) for chunk in chunks)
+    return list(dict.fromkeys(pid for pid in post_ids if pid is not None))
+
+
 def semantic_search(query: str, limit: int = 20, offset: int = 0):
     """
     Searches the vector store using similarity search with pagination.
     Returns a list of unique Post IDs for the most similar documents for the given page,
     ordered by relevance.
 
+    Chunks are fetched incrementally: the first round asks for offset + limit * SEMANTIC_SEARCH_FETCH_MULTIPLIER
+    chunks and each further round doubles k, until enough unique posts are found, the collection is exhausted,
+    or the (offset + limit) * SEMANTIC_SEARCH_MAX_FETCH_MULTIPLIER budget is reached. Every round re-runs the
+    whole query, so doubling keeps the total rows decoded under about twice a single max-size query.
+    The query is embedded only once for all rounds.
+
     Args:
         query (str): The search query.
         limit (int): The maximum number of Post IDs to return for the current page (default: 20).
         offset (int): The starting index of Post IDs to retrieve for pagination (default: 0).
     """
+    if _is_query_too_short(query):
+        logger.debug("Query is empty or too short, skipping vector store search.")
+        return []
     try:
         vector_store = get_vector_store()
 
-        # Calculate the total number of chunks to fetch to cover the desired page.
-        # This needs to be large enough to potentially find 'limit' unique post_ids
-        # after processing. We might fetch more chunks than 'limit' post_ids.
-        # A simple heuristic: fetch 3-5 times the number of desired post_ids,
-        # as multiple chunks might belong to the same post or be irrelevant.
-        # This value might need tuning based on typical data distribution.
-        fetch_k_chunks = (
-            offset + limit
-        ) * 5  # Fetch more chunks to ensure enough unique posts
+        target_post_count = offset + limit
+        max_fetch_k = target_post_count * SEMANTIC_SEARCH_MAX_FETCH_MULTIPLIER
+        fetch_k_chunks = min(
+            offset + limit * SEMANTIC_SEARCH_FETCH_MULTIPLIER, max_fetch_k
+        )
 
         logger.info(
             f"Searching vector store with similarity search for query: '{query}', "
-            f"fetching up to {fetch_k_chunks} chunks for pagination (target offset={offset}, target limit={limit} post IDs)"
+            f"starting with {fetch_k_chunks} chunks (up to {max_fetch_k}) for pagination (target offset={offset}, target limit={limit} post IDs)"
         )
 
-        # Perform similarity search to get enough document chunks
-        all_results_chunks = vector_store.similarity_search(
-            query=query, k=fetch_k_chunks
-        )
+        query_embedding = embed_query_cached(query)
+
+        while True:
+            all_results_chunks = _similarity_search_by_vector(
+                vector_store, query_embedding, fetch_k_chunks
+            )
+            unique_post_ids = extract_unique_post_ids(all_results_chunks)
+
+            if (
+                len(unique_post_ids) >= target_post_count
+                or len(all_results_chunks) < fetch_k_chunks  # collection exhausted
+                or fetch_k_chunks >= max_fetch_k
+            ):
+                break
+            fetch_k_chunks = min(fetch_k_chunks * 2, max_fetch_k)
 
         logger.info(
             f"Fetched {len(all_results_chunks)} document chunks for query: '{query}'."
         )
 
-        # Extract unique Post IDs from the chunks, preserving order of first appearance
-        unique_post_ids = []
-        seen_post_ids = set()
-
-        for chunk in all_results_chunks:
-            if not chunk.metadata:
-                logger.warning(
-                    f"Document chunk {chunk.id if hasattr(chunk, 'id') else 'unknown'} has no metadata."
-                )
-                continue
-
-            original_doc_id = chunk.metadata.get(ORIGINAL_DOC_ID_KEY)
-            post_id = None
-
-            try:
-                if original_doc_id and original_doc_id.startswith("post_"):
-                    post_id = int(original_doc_id.split("_")[1])
-                elif original_doc_id and (
-                    original_doc_id.startswith("comment_")
-                    or original_doc_id.startswith("reply_")
-                ):
-                    # For comments/replies, the metadata should contain the parent post_id
-                    post_id_str = chunk.metadata.get("post_id")
-                    if post_id_str:
-                        post_id = int(post_id_str)
-                    else:
-                        logger.warning(
-                            f"Chunk {original_doc_id} is a comment/reply but lacks 'post_id' in metadata."
-                        )
-                else:
-                    logger.warning(
-                        f"Chunk {original_doc_id or 'unknown'} has an unrecognized original_doc_id format."
-                    )
-                    continue
-
-                if post_id and post_id not in seen_post_ids:
-                    unique_post_ids.append(post_id)
-                    seen_post_ids.add(post_id)
-
-            except ValueError:
-                logger.warning(
-                    f"Could not parse post ID from original_doc_id: '{original_doc_id}' or metadata post_id: '{chunk.metadata.get('post_id')}'"
-                )
-                continue
-            except Exception as e:
-                logger.error(
-                    f"Unexpected error processing chunk {original_doc_id}: {e}",
-                    exc_info=True,
-                )
-                continue
-
         # Apply pagination to the list of unique Post IDs
         paginated_post_ids = unique_post_ids[offset : offset + limit]
 
@@ -315,6 +807,26 @@ def semantic_search(query: str, limit: int = 20, offset: int = 0):
         return []
 
 
+def _similarity_search_by_vector(
+    vector_store, embedding_vector: list[float], k: int
+) -> list[Document]:
+    """
+    Plain similarity search by vector straight against the Chroma collection, skipping LangChain's
+    wrapper: only the metadatas and documents of the k results are fetched and wrapped into Documents.
+    """
+    results = vector_store._collection.query(
+        query_embeddings=[embedding_vector],
+        n_results=k,
+        include=["metadatas", "documents"],
+    )
+    return [
+        Document(id=chunk_id, page_content=text, metadata=metadata or {})
+        for chunk_id, text, metadata in zip(
+            results["ids"][0], results["documents"][0], results["metadatas"][0]
+        )
+    ]
+
+
 def search_by_vector(
     embedding_vector: list[float],
     k: int = 10,
@@ -335,6 +847,18 @@ def search_by_vector(
         list[Document]: A list of diverse, relevant document chunks.
     """
     try:
+        if embedding_vector is None:
+            logger.debug("No embedding vector given, skipping vector store search.")
+            return []
+        # Raises (and is logged below) for ragged or non-numeric input.
+        vector = np.asarray(embedding_vector, dtype=float)
+        # zero-norm or NaN/inf: no meaningful similarity
+        if not vector.size or not np.any(vector) or not np.all(np.isfinite(vector)):
+            logger.debug(
+                "Embedding vector is empty, zero or not finite, skipping vector store search."
+            )
+            return []
+
         vector_store = get_vector_store()
         logger.info(
             f"Searching vector store with MMR by vector, k={k}, fetch_k={fetch_k}"
@@ -348,9 +872,7 @@ def search_by_vector(
                 lambda_mult=lambda_mult,
             )
         else:
-            results = vector_store.similarity_search_by_vector(
-                embedding=embedding_vector, k=k
-            )
+            results = _similarity_search_by_vector(vector_store, embedding_vector, k)
 
         logger.info(f"Found {len(results)} document chunks by vector search.")
         return results
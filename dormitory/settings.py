@@ -140,12 +140,36 @@ SIMPLE_JWT = {
     "BLACKLIST_AFTER_ROTATION": False,
 }
 
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    # Search query embeddings, shared by all worker processes so paginated searches embed the query once
+    "query_embeddings": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": BASE_DIR / "cache" / "query_embeddings",
+        "OPTIONS": {"MAX_ENTRIES": 5000},
+    },
+}
+QUERY_EMBEDDING_CACHE_TIMEOUT = 600  # seconds
+
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media/")
 
 
 CHROMA_PERSIST_DIRECTORY = BASE_DIR / "vectorstore"
 CHROMA_USER_PERSIST_DIRECTORY = BASE_DIR / "user_vectorstore"
+# HNSW index parameters of the content collection (Chroma defaults: M=16, construction_ef=100, search_ef=10).
+# Applied when the collection is created, so changing them requires rebuilding the vector store.
+CHROMA_HNSW_M = int(os.environ.get("CHROMA_HNSW_M", 32))
+CHROMA_HNSW_CONSTRUCTION_EF = int(os.environ.get("CHROMA_HNSW_CONSTRUCTION_EF", 200))
+CHROMA_HNSW_SEARCH_EF = int(os.environ.get("CHROMA_HNSW_SEARCH_EF", 64))
+# Split documents with the Rust-backed semantic-text-splitter; set False to use LangChain's RecursiveCharacterTextSplitter
+USE_RUST_TEXT_SPLITTER = True
+# Max number of embedding API requests in flight at once during concurrent ingest (provider rate limit)
+EMBEDDING_CONCURRENCY = 4
+# Load the embedding client and Chroma at server start instead of on the first search request
+VECTORSTORE_WARMUP = True
 # EMBEDDING_MODEL_NAME = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2" # no longer local embedding model used
 GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY")
 EMBEDDING_API_KEY = os.environ.get("EMBEDDING_API_KEY")
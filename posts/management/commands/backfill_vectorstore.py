@@ -0,0 +1,119 @@
+import json
+import logging
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from LLMintegration.vectorstore_utils import (
+    aadd_documents,
+    delete_stale_chunks_from_vectorstore,
+)
+from posts.models import Comment, Post, Reply
+from posts.signals import (
+    comment_to_vector_document,
+    post_to_vector_document,
+    reply_to_vector_document,
+)
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_FILENAME = (
+    "backfill_checkpoint.json"  # stored inside CHROMA_PERSIST_DIRECTORY
+)
+
+# (checkpoint key, queryset, document builder) in ingest order
+SOURCES = [
+    ("post", Post.objects.select_related("author"), post_to_vector_document),
+    (
+        "comment",
+        Comment.objects.select_related("author", "post"),
+        comment_to_vector_document,
+    ),
+    (
+        "reply",
+        Reply.objects.select_related("author", "comment__post"),
+        reply_to_vector_document,
+    ),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "(Re-)embeds all posts, comments and replies into the Chroma vector store in batches. "
+        "Progress is checkpointed, so an interrupted run continues where it stopped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Rows fetched and embedded per batch (default: 500).",
+        )
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Ignore the saved checkpoint and start from the beginning.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        checkpoint_path = settings.CHROMA_PERSIST_DIRECTORY / CHECKPOINT_FILENAME
+        checkpoint = {}
+        if checkpoint_path.exists() and not options["restart"]:
+            checkpoint = json.loads(checkpoint_path.read_text())
+            self.stdout.write(f"Resuming from checkpoint: {checkpoint}")
+
+        for key, queryset, to_vector_document in SOURCES:
+            last_id = checkpoint.get(key, 0)
+            rows = queryset.filter(pk__gt=last_id).order_by("pk")
+            self.stdout.write(f"Backfilling {rows.count()} {key} rows...")
+
+            batch = []
+            for instance in rows.iterator(chunk_size=batch_size):
+                batch.append(instance)
+                if len(batch) >= batch_size:
+                    last_id = self._ingest_batch(batch, to_vector_document)
+                    checkpoint[key] = last_id
+                    self._save_checkpoint(checkpoint_path, checkpoint)
+                    batch = []
+            if batch:
+                checkpoint[key] = self._ingest_batch(batch, to_vector_document)
+                self._save_checkpoint(checkpoint_path, checkpoint)
+
+        checkpoint_path.unlink(missing_ok=True)
+        self.stdout.write(self.style.SUCCESS("Vector store backfill complete."))
+
+    def _ingest_batch(self, instances, to_vector_document):
+        """Embeds one batch, stores the chunk counts and returns the last primary key processed."""
+        documents = [to_vector_document(instance) for instance in instances]
+        # Embedding requests of the batch run concurrently inside aadd_documents.
+        # Returns once the batch is written to Chroma, so the checkpoint never moves past lost chunks.
+        chunk_counts = async_to_sync(aadd_documents)(documents)
+        if chunk_counts is None:
+            raise CommandError(
+                f"Adding batch ending at pk {instances[-1].pk} failed; see logs. Re-run to resume."
+            )
+
+        updated = []
+        for instance, (doc_id, _, _) in zip(instances, documents):
+            chunk_count = chunk_counts.get(doc_id, 0)
+            if instance.chunk_count != chunk_count:
+                delete_stale_chunks_from_vectorstore(
+                    doc_id, chunk_count, instance.chunk_count
+                )
+                instance.chunk_count = chunk_count
+                updated.append(instance)
+        # bulk_update doesn't send post_save, so the signal handlers don't re-embed these rows.
+        type(instances[0]).objects.bulk_update(updated, ["chunk_count"])
+
+        self.stdout.write(
+            f"  {len(instances)} rows up to pk {instances[-1].pk}: "
+            f"{sum(chunk_counts.values())} chunks."
+        )
+        return instances[-1].pk
+
+    def _save_checkpoint(self, checkpoint_path, checkpoint):
+        checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
+        checkpoint_path.write_text(json.dumps(checkpoint))
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.1 on 2026-10-15 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0002_tag_post_source_url_post_tags'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='chunk_count',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='chunk_count',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='reply',
+            name='chunk_count',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+    ]
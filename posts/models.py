@@ -23,6 +23,9 @@ class Post(models.Model):
         blank=True,
         help_text="The source URL of the opportunity to prevent duplicates. Can be used for other purposes as well.",
     )
+    # Number of chunks stored in the vector store (chunk IDs are <doc_id>_chunk_<i>), so deletes can go by ID.
+    # Null for rows ingested before this was tracked.
+    chunk_count = models.PositiveIntegerField(null=True, blank=True, editable=False)
 
     class Meta:
         ordering = ["-created_at"]
@@ -36,6 +39,9 @@ class Comment(models.Model):
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name="comments")
     body = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
+    chunk_count = models.PositiveIntegerField(
+        null=True, blank=True, editable=False
+    )  # see Post.chunk_count
 
     def __str__(self):
         return f"Comment by {self.author.username} on post {self.post.id}: {self.body[:30]}"
@@ -48,6 +54,9 @@ class Reply(models.Model):
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name="replies")
     body = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
+    chunk_count = models.PositiveIntegerField(
+        null=True, blank=True, editable=False
+    )  # see Post.chunk_count
 
     class Meta:
         ordering = ["created_at"]  # Order by oldest first for replies in a thread
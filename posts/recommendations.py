@@ -2,7 +2,7 @@ import logging
 from django.contrib.auth.models import User
 from .models import Post, PostView
 from users.interest_modeling import get_user_interest_vector
-from LLMintegration.vectorstore_utils import search_by_vector, ORIGINAL_DOC_ID_KEY
+from LLMintegration.vectorstore_utils import extract_unique_post_ids, search_by_vector
 from django.db import models
 
 logger = logging.getLogger(__name__)
@@ -63,27 +63,12 @@ def get_recommended_posts(user: User, page: int = 1, page_size: int = 10):
             fetch_k=candidate_pool * 2,
             use_mmr=False,
         )
-        # extract and filter IDs
-        candidate_post_ids = []
-        for chunk in similar_chunks:
-            doc_id = chunk.metadata.get(ORIGINAL_DOC_ID_KEY)
-            try:
-                if doc_id and doc_id.startswith("post_"):
-                    pid = int(doc_id.split("_")[1])  # extract post ID from "post_<id>"
-                elif doc_id and doc_id.startswith(("comment_", "reply_")):
-                    pid = int(chunk.metadata.get("post_id", 0))
-                else:
-                    continue
-
-                if pid and pid not in exclude_ids:
-                    candidate_post_ids.append(pid)
-            except Exception:
-                continue
-        # preserve order and unique
-        # Converts candidate_post_ids into a dictionary (keys preserve order and remove duplicates).
-        candidate_post_ids_dict = dict.fromkeys(candidate_post_ids)
-        # Converts the dictionary back into a list, ensuring the IDs are unique and their original order is preserved.
-        unique_filtered_ids = list(candidate_post_ids_dict)
+        # extract unique post IDs (order preserved) and drop seen/own posts
+        unique_filtered_ids = [
+            pid
+            for pid in extract_unique_post_ids(similar_chunks)
+            if pid not in exclude_ids
+        ]
         # if enough for pagination, break
         if len(unique_filtered_ids) >= page * page_size:
             break  # from the loop as we have enough unique IDs
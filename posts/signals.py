@@ -40,6 +40,7 @@ from django.dispatch import receiver
 from LLMintegration.vectorstore_utils import (
     add_document_to_vectorstore,
     delete_document_from_vectorstore,
+    delete_stale_chunks_from_vectorstore,
 )
 
 from .models import Comment, Post, Reply, PostLike
@@ -52,22 +53,81 @@ from users.interest_modeling import (
 logger = logging.getLogger(__name__)
 
 
+# --- Vector store documents ---
+# Each returns (doc_id, text_content, metadata) as expected by add_document(s)_to_vectorstore.
+# Also used by the backfill_vectorstore management command.
+def post_to_vector_document(post):
+    doc_id = f"post_{post.id}"
+    content_to_embed = f"Post Title: {post.title}\nPost Content: {post.content}"
+    metadata = {
+        "source_type": "post",
+        "document_id": post.id,
+        "post_id": post.id,  # int, so search can map every chunk to its post without parsing doc IDs
+        "title": post.title,
+        "author_username": post.author.username,
+        "created_at": post.created_at.date().isoformat(),
+        "url": f"/posts/{post.id}/",
+    }
+    return doc_id, content_to_embed, metadata
+
+
+def comment_to_vector_document(comment):
+    doc_id = f"comment_{comment.id}"
+    content_to_embed = f"Comment on post titled '{comment.post.title}': {comment.body}"
+    metadata = {
+        "source_type": "comment",
+        "document_id": comment.id,
+        "post_id": comment.post.id,
+        "post_title": comment.post.title,
+        "author_username": comment.author.username,
+        "created_at": comment.created_at.isoformat(),
+        "url": f"/posts/{comment.post.id}/comment/{comment.id}",
+    }
+    return doc_id, content_to_embed, metadata
+
+
+def reply_to_vector_document(reply):
+    doc_id = f"reply_{reply.id}"
+    content_to_embed = (
+        f"Reply to a comment on post titled '{reply.comment.post.title}': {reply.body}"
+    )
+    metadata = {
+        "source_type": "reply",
+        "document_id": reply.id,
+        "comment_id": reply.comment.id,
+        "post_id": reply.comment.post.id,
+        "author_username": reply.author.username,
+        "created_at": reply.created_at.isoformat(),
+        "url": f"/posts/{reply.comment.post.id}/comment/{reply.comment.id}",
+    }
+    return doc_id, content_to_embed, metadata
+
+
+def _store_chunk_count(instance, doc_id, chunk_count, created):
+    """
+    Records how many vector store chunks the instance has, so deletes can go by chunk ID,
+    and removes chunks left over from a longer previous version of the content.
+    """
+    if chunk_count is None:  # adding to the vector store failed, keep the old count
+        return
+    # A new row has no previous chunks; only legacy rows (count never stored) need the metadata-filter delete.
+    previous_chunk_count = 0 if created else instance.chunk_count
+    if previous_chunk_count is None or previous_chunk_count > chunk_count:
+        delete_stale_chunks_from_vectorstore(doc_id, chunk_count, previous_chunk_count)
+    if instance.chunk_count != chunk_count:
+        # queryset update() so post_save isn't triggered again
+        type(instance).objects.filter(pk=instance.pk).update(chunk_count=chunk_count)
+        instance.chunk_count = chunk_count
+
+
 # --- Post Signals ---
 @receiver(post_save, sender=Post)
 def post_save_handler(sender, instance, created, **kwargs):
     """Handles embedding the post and updating the author's interest vector."""
     # 1. Embed and add the post to the vector store
-    doc_id = f"post_{instance.id}"
-    content_to_embed = f"Post Title: {instance.title}\nPost Content: {instance.content}"
-    metadata = {
-        "source_type": "post",
-        "document_id": str(instance.id),
-        "title": instance.title,
-        "author_username": instance.author.username,
-        "created_at": instance.created_at.date().isoformat(),
-        "url": f"/posts/{instance.id}/",
-    }
-    add_document_to_vectorstore(doc_id, content_to_embed, metadata)
+    doc_id, content_to_embed, metadata = post_to_vector_document(instance)
+    chunk_count = add_document_to_vectorstore(doc_id, content_to_embed, metadata)
+    _store_chunk_count(instance, doc_id, chunk_count, created)
 
     # 2. If a new post is created, update the user's interest vector
     if created:
@@ -84,7 +144,7 @@ def delete_post_from_vectorstore(sender, instance, **kwargs):
     try:
         logger.info(f"Signal received: post_delete for Post ID {instance.id}")
         doc_id = f"post_{instance.id}"
-        delete_document_from_vectorstore(doc_id)
+        delete_document_from_vectorstore(doc_id, instance.chunk_count)
     except Exception as e:
         logger.error(
             f"Error in delete_post_from_vectorstore signal for Post ID {instance.id}: {e}",
@@ -106,20 +166,9 @@ def post_like_save_handler(sender, instance, created, **kwargs):
 @receiver(post_save, sender=Comment)
 def comment_save_handler(sender, instance, created, **kwargs):
     """Handles embedding the comment and updating the author's interest vector."""
-    doc_id = f"comment_{instance.id}"
-    content_to_embed = (
-        f"Comment on post titled '{instance.post.title}': {instance.body}"
-    )
-    metadata = {
-        "source_type": "comment",
-        "document_id": str(instance.id),
-        "post_id": str(instance.post.id),
-        "post_title": instance.post.title,
-        "author_username": instance.author.username,
-        "created_at": instance.created_at.isoformat(),
-        "url": f"/posts/{instance.post.id}/comment/{instance.id}",
-    }
-    add_document_to_vectorstore(doc_id, content_to_embed, metadata)
+    doc_id, content_to_embed, metadata = comment_to_vector_document(instance)
+    chunk_count = add_document_to_vectorstore(doc_id, content_to_embed, metadata)
+    _store_chunk_count(instance, doc_id, chunk_count, created)
 
     if created:
         embedding = _get_item_embedding(instance)
@@ -135,7 +184,7 @@ def delete_comment_from_vectorstore(sender, instance, **kwargs):
     try:
         logger.info(f"Signal received: post_delete for Comment ID {instance.id}")
         doc_id = f"comment_{instance.id}"
-        delete_document_from_vectorstore(doc_id)
+        delete_document_from_vectorstore(doc_id, instance.chunk_count)
     except Exception as e:
         logger.error(
             f"Error in delete_comment_from_vectorstore for Comment ID {instance.id}: {e}",
@@ -147,18 +196,9 @@ def delete_comment_from_vectorstore(sender, instance, **kwargs):
 @receiver(post_save, sender=Reply)
 def reply_save_handler(sender, instance, created, **kwargs):
     """Handles embedding the reply and updating the author's interest vector."""
-    doc_id = f"reply_{instance.id}"
-    content_to_embed = f"Reply to a comment on post titled '{instance.comment.post.title}': {instance.body}"
-    metadata = {
-        "source_type": "reply",
-        "document_id": str(instance.id),
-        "comment_id": str(instance.comment.id),
-        "post_id": str(instance.comment.post.id),
-        "author_username": instance.author.username,
-        "created_at": instance.created_at.isoformat(),
-        "url": f"/posts/{instance.comment.post.id}/comment/{instance.comment.id}",
-    }
-    add_document_to_vectorstore(doc_id, content_to_embed, metadata)
+    doc_id, content_to_embed, metadata = reply_to_vector_document(instance)
+    chunk_count = add_document_to_vectorstore(doc_id, content_to_embed, metadata)
+    _store_chunk_count(instance, doc_id, chunk_count, created)
 
     if created:
         embedding = _get_item_embedding(instance)
@@ -174,7 +214,7 @@ def delete_reply_from_vectorstore(sender, instance, **kwargs):
     try:
         logger.info(f"Signal received: post_delete for Reply ID {instance.id}")
         doc_id = f"reply_{instance.id}"
-        delete_document_from_vectorstore(doc_id)
+        delete_document_from_vectorstore(doc_id, instance.chunk_count)
     except Exception as e:
         logger.error(
             f"Error in delete_reply_from_vectorstore for Reply ID {instance.id}: {e}",
@@ -0,0 +1,68 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from posts import signals
+
+
+class StoreChunkCountTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch.object(signals, "delete_stale_chunks_from_vectorstore")
+        self.delete_stale = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _row(self, chunk_count):
+        # Stand-in for a Post/Comment/Reply: _store_chunk_count only uses pk, chunk_count and objects.
+        row = type("Row", (), {"objects": mock.Mock()})()
+        row.pk = 1
+        row.chunk_count = chunk_count
+        return row
+
+    def _stored_count(self, row):
+        update = row.objects.filter.return_value.update
+        if not update.called:
+            return None
+        return update.call_args.kwargs["chunk_count"]
+
+    def test_new_row_stores_count_without_stale_delete(self):
+        row = self._row(None)
+        signals._store_chunk_count(row, "post_1", 3, created=True)
+        self.delete_stale.assert_not_called()
+        self.assertEqual(self._stored_count(row), 3)
+        self.assertEqual(row.chunk_count, 3)
+
+    def test_new_row_without_chunks_stores_zero(self):
+        row = self._row(None)
+        signals._store_chunk_count(row, "post_1", 0, created=True)
+        self.delete_stale.assert_not_called()
+        self.assertEqual(self._stored_count(row), 0)
+
+    def test_shorter_edit_deletes_stale_chunks_by_id(self):
+        row = self._row(5)
+        signals._store_chunk_count(row, "post_1", 2, created=False)
+        self.delete_stale.assert_called_once_with("post_1", 2, 5)
+        self.assertEqual(self._stored_count(row), 2)
+
+    def test_longer_edit_only_stores_count(self):
+        row = self._row(2)
+        signals._store_chunk_count(row, "post_1", 4, created=False)
+        self.delete_stale.assert_not_called()
+        self.assertEqual(self._stored_count(row), 4)
+
+    def test_unchanged_count_does_nothing(self):
+        row = self._row(2)
+        signals._store_chunk_count(row, "post_1", 2, created=False)
+        self.delete_stale.assert_not_called()
+        self.assertIsNone(self._stored_count(row))
+
+    def test_legacy_row_falls_back_to_metadata_delete(self):
+        row = self._row(None)
+        signals._store_chunk_count(row, "post_1", 2, created=False)
+        self.delete_stale.assert_called_once_with("post_1", 2, None)
+        self.assertEqual(self._stored_count(row), 2)
+
+    def test_failed_ingest_keeps_old_count(self):
+        row = self._row(2)
+        signals._store_chunk_count(row, "post_1", None, created=False)
+        self.delete_stale.assert_not_called()
+        self.assertIsNone(self._stored_count(row))